@@ -19,7 +19,8 @@ Before running this notebook, make sure to:
    ```bash
    pip install pinecone-client sentence-transformers
    ```
-4. Create a Pinecone index named 'products' with dimension 384 (for all-MiniLM-L6-v2 model)
+   Optionally install `optimum[onnxruntime]` for a faster int8 ONNX encoder on CPU.
+4. Create a Pinecone index named 'products' with dimension 384 (for all-MiniLM-L6-v2 model) and the dotproduct metric
 
 # Role-Based Access Control (RBAC) with Vector Database Demo
 
@@ -87,15 +88,103 @@ First, let's import required libraries and set up our environment.
 
 # !pip install pinecone-client sentence-transformers
 
-from typing import Dict, List, Set
+from typing import Dict, FrozenSet, List, Mapping, Set
 from dataclasses import dataclass
 from datetime import datetime
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import functools
+import io
+import logging
+import operator
 import os
+import queue
+import sys
+import threading
 import time
+import numpy as np
+import torch
+
+# Log through the logging module instead of print so verbosity can be turned down;
+# the message-only format keeps the demo output readable
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+log = logging.getLogger(__name__)
+
+# Per-thread log capture: while a thread has a buffer set, its records go there
+# instead of to the console (used to keep parallel test reports separate)
+_log_capture = threading.local()
+
+class _ThreadBufferFilter(logging.Filter):
+    def filter(self, record):
+        buffer = getattr(_log_capture, "buffer", None)
+        if buffer is None:
+            return True
+        buffer.write(record.getMessage() + "\n")
+        return False
+
+log.addFilter(_ThreadBufferFilter())
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Fall back to a plain NumPy kernel for local search
+    NUMBA_AVAILABLE = False
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    # Without optimum the CPU path keeps using the PyTorch SentenceTransformer
+    ONNX_AVAILABLE = False
 from pinecone import Pinecone, ServerlessSpec
 from sentence_transformers import SentenceTransformer
 from uuid import uuid4
 
+# Interned permission and role names: callers pass these shared objects so
+# set and dict lookups can short-circuit on identity instead of comparing strings
+P_VIEW_PRODUCTS = sys.intern("view_products")
+P_VIEW_OWN_ORDERS = sys.intern("view_own_orders")
+P_PLACE_ORDER = sys.intern("place_order")
+P_VECTOR_SEARCH_BASIC = sys.intern("vector_search_basic")
+P_VIEW_ALL_ORDERS = sys.intern("view_all_orders")
+P_UPDATE_ORDER_STATUS = sys.intern("update_order_status")
+P_VIEW_CUSTOMER_INFO = sys.intern("view_customer_info")
+P_VECTOR_SEARCH_ADVANCED = sys.intern("vector_search_advanced")
+P_VECTOR_CREATE = sys.intern("vector_create")
+P_VECTOR_DELETE = sys.intern("vector_delete")
+P_VECTOR_UPDATE = sys.intern("vector_update")
+P_UPDATE_PRODUCT_STOCK = sys.intern("update_product_stock")
+P_MANAGE_USERS = sys.intern("manage_users")
+P_VECTOR_MANAGE_INDEX = sys.intern("vector_manage_index")
+
+PERMISSIONS = frozenset({
+    P_VIEW_PRODUCTS,
+    P_VIEW_OWN_ORDERS,
+    P_PLACE_ORDER,
+    P_VECTOR_SEARCH_BASIC,
+    P_VIEW_ALL_ORDERS,
+    P_UPDATE_ORDER_STATUS,
+    P_VIEW_CUSTOMER_INFO,
+    P_VECTOR_SEARCH_ADVANCED,
+    P_VECTOR_CREATE,
+    P_VECTOR_DELETE,
+    P_VECTOR_UPDATE,
+    P_UPDATE_PRODUCT_STOCK,
+    P_MANAGE_USERS,
+    P_VECTOR_MANAGE_INDEX
+})
+
+ROLE_CUSTOMER = sys.intern("customer")
+ROLE_SALES_REP = sys.intern("sales_rep")
+ROLE_DATA_SCIENTIST = sys.intern("data_scientist")
+ROLE_ADMIN = sys.intern("admin")
+ROLE_SENIOR_SALES_REP = sys.intern("senior_sales_rep")
+ROLE_SENIOR_DATA_SCIENTIST = sys.intern("senior_data_scientist")
+
 # Base data classes
 @dataclass
 class User:
@@ -125,50 +214,153 @@ class Order:
 # Initialize Pinecone client
 pc = Pinecone(api_key="")#os.environ.get('PINECONE_API_KEY'))
 
-# Initialize sentence transformer for embeddings
-model = SentenceTransformer('all-MiniLM-L6-v2')
+class ONNXSentenceEncoder:
+    """Int8-quantized ONNX Runtime encoder with the same encode() interface as SentenceTransformer"""
+
+    def __init__(self, model_id: str, save_dir: str, max_length: int = 256):
+        # Export and quantize once; later runs load the saved model. Checking for the
+        # quantized file (not just the directory) retries a half-finished export
+        if not os.path.isfile(os.path.join(save_dir, "model_quantized.onnx")):
+            ORTModelForFeatureExtraction.from_pretrained(model_id, export=True).save_pretrained(save_dir)
+            AutoTokenizer.from_pretrained(model_id).save_pretrained(save_dir)
+            quantizer = ORTQuantizer.from_pretrained(save_dir)
+            qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=save_dir, quantization_config=qconfig)
+        self.tokenizer = AutoTokenizer.from_pretrained(save_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(save_dir, file_name="model_quantized.onnx")
+        self.max_length = max_length
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Encode longest sentences first so each batch pads to a similar length
+        order = np.argsort([-len(sentence) for sentence in sentences])
+        embeddings = np.empty((len(sentences), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch_idx = order[start:start + batch_size]
+            inputs = self.tokenizer(
+                [sentences[i] for i in batch_idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.model(**inputs).last_hidden_state
+
+            # Mean pooling over non-padding tokens, as in the sentence-transformers model
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[batch_idx] = pooled
+
+        if normalize_embeddings:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings[0] if single else embeddings
+
+# Initialize sentence transformer for embeddings, on GPU when one is available
+device = "cuda" if torch.cuda.is_available() else "cpu"
+USE_FP16 = True  # Half precision is only applied on GPU; CPU runs stay in FP32
+USE_ONNX = True  # On CPU, run an int8 ONNX export of the model when optimum is installed
+# The exported model is cached per user, not in the current working directory
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rbac_pinecone_demo", "onnx")
+model = None
+if device == "cpu" and USE_ONNX and ONNX_AVAILABLE:
+    try:
+        model = ONNXSentenceEncoder("sentence-transformers/all-MiniLM-L6-v2", ONNX_CACHE_DIR)
+    except Exception as e:
+        log.error("Error loading ONNX encoder, falling back to PyTorch: %s", str(e))
+if model is None:
+    model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+    if device == "cuda" and USE_FP16:
+        model.half()
+log.info("Embedding model loaded on %s", device)
 
 # Setup Pinecone index
 def setup_pinecone_index(index_name: str = "products", dimension: int = 384):
-    """Setup Pinecone index for product embeddings"""
+    """Setup Pinecone index for product embeddings
+
+    Returns the index handle and its similarity metric, or (None, None) on failure.
+    """
     try:
         # Check if index already exists
         existing_indexes = pc.list_indexes()
         if index_name not in existing_indexes.names():
-            print(f"Creating new Pinecone index: {index_name}")
+            log.info("Creating new Pinecone index: %s", index_name)
             # Create index using serverless spec in us-east-1
             pc.create_index(
                 name=index_name,
                 dimension=dimension,
-                metric="cosine",
+                # Embeddings are normalized locally, so dot product equals cosine similarity
+                metric="dotproduct",
                 spec=ServerlessSpec(
                     cloud="aws",
                     region="us-east-1"
                 )
             )
-            print("Index created successfully!")
-            print("Waiting for index to be ready...")
+            log.info("Index created successfully!")
+            log.info("Waiting for index to be ready...")
             # Wait for index to be ready
             while not pc.describe_index(index_name).status['ready']:
                 time.sleep(1)
+            metric = "dotproduct"
         else:
-            print(f"Using existing index: {index_name}")
+            log.info("Using existing index: %s", index_name)
+            # Older setups created the index with the cosine metric; scores are
+            # only rescaled on dotproduct indexes, and other metrics don't apply
+            metric = pc.describe_index(index_name).metric
+            if metric not in ("dotproduct", "cosine"):
+                raise ValueError(
+                    f"Index '{index_name}' uses the '{metric}' metric; "
+                    "expected 'dotproduct' (or 'cosine')"
+                )
+            log.info("Index metric: %s", metric)
 
-        # Connect to the index
-        index = pc.Index(index_name)
-        print("Successfully connected to index!")
-        return index
+        # Connect to the index once; this handle is shared by the whole demo.
+        # pool_threads lets async upserts and concurrent queries run in parallel
+        index = pc.Index(index_name, pool_threads=30)
+        log.info("Successfully connected to index!")
+        return index, metric
     except Exception as e:
-        print(f"Error setting up Pinecone index: {str(e)}")
+        log.error("Error setting up Pinecone index: %s", str(e))
         if 'response body' in str(e):
-            print("Details:", str(e))
-        return None
+            log.error("Details: %s", str(e))
+        return None, None
+
+# Fixed int8 step for normalized embeddings: unit-vector components stay well
+# inside [-0.5, 0.5], and one shared scale keeps dot-product rankings intact.
+# Note the index still stores float32 values: sending int8 codes only lowers
+# precision and makes the JSON payload somewhat smaller; it does not cut index
+# memory or query bandwidth. Scores are rescaled with int8_score_scale below.
+INT8_SCALE = 0.5 / 127
+
+def int8_score_scale(metric: str) -> float:
+    """Factor that turns a raw score between int8 codes back into cosine similarity"""
+    # A dotproduct index scores codes as (x / s) . (y / s); a cosine index
+    # normalizes the codes itself, so its scores need no rescaling
+    return INT8_SCALE ** 2 if metric == "dotproduct" else 1.0
+
+def quantize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """Quantize normalized float32 embeddings to int8 codes using INT8_SCALE"""
+    return np.clip(np.round(embeddings / INT8_SCALE), -127, 127).astype(np.int8)
+
+def bulk_upsert(index, vectors: List, chunk_size: int = 100) -> List:
+    """Upsert vectors in chunks as parallel async requests and wait for all of them"""
+    async_results = [
+        index.upsert(vectors=vectors[i:i + chunk_size], async_req=True)
+        for i in range(0, len(vectors), chunk_size)
+    ]
+    return [async_result.get() for async_result in async_results]
 
 # Initialize the index
-print("Setting up Pinecone index...")
-products_index = setup_pinecone_index()
+log.info("Setting up Pinecone index...")
+products_index, products_index_metric = setup_pinecone_index()
 if not products_index:
-    raise RuntimeError("Failed to setup Pinecone index. Please check the error messages above.")
+    log.warning("Pinecone index unavailable, falling back to local in-memory vector search.")
 
 """## 2. Create Demo Data
 
@@ -203,10 +395,10 @@ Watch the output below to see the vector creation process and verification steps
 
 # Create demo data
 users = [
-    User(1, "alice", "customer"),
-    User(2, "bob", "sales_rep"),
-    User(3, "carol", "data_scientist"),
-    User(4, "david", "admin")
+    User(1, "alice", ROLE_CUSTOMER),
+    User(2, "bob", ROLE_SALES_REP),
+    User(3, "carol", ROLE_DATA_SCIENTIST),
+    User(4, "david", ROLE_ADMIN)
 ]
 
 # Products with detailed descriptions
@@ -240,68 +432,153 @@ orders = [
 ]
 
 # Create vector embeddings for products
-print("Creating vector embeddings for products...")
-for product in products:
-    # Generate embedding for product description
-    print(f"\nProcessing: {product.name}")
-    embedding = model.encode(product.description)
-
-    # Generate a unique vector ID
-    product.vector_id = str(uuid4())
-
-    # Create metadata for the vector
-    metadata = {
-        "product_id": str(product.id),
-        "name": product.name,
-        "price": float(product.price),
-        "stock": int(product.stock),
-        "description": product.description
-    }
+def ingest_products(products: List[Product], embeddings_chunk_size: int = 1000, batch_size: int = 32):
+    """Encode and upsert products, overlapping encoding with Pinecone upserts
+
+    A producer thread encodes descriptions chunk by chunk while the calling
+    thread quantizes and upserts each finished chunk. Returns the normalized
+    embeddings of all products and the upsert responses.
+    """
+    chunks = queue.Queue(maxsize=2)
+    errors = []
+    stop = threading.Event()  # set by the consumer to make the producer give up
+
+    def put(item) -> bool:
+        # Block on a full queue only until the consumer asks us to stop
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for start in range(0, len(products), embeddings_chunk_size):
+                if stop.is_set():
+                    return
+                chunk = products[start:start + embeddings_chunk_size]
+                chunk_embeddings = model.encode(
+                    [product.description for product in chunk],
+                    batch_size=64,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+                if not put((chunk, chunk_embeddings)):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(None)
 
-    # Get current vector count
-    vector_count_before = products_index.describe_index_stats().total_vector_count
-    print(f"Current vector count: {vector_count_before}")
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
 
-    # Upsert vector to Pinecone
+    all_embeddings = []
+    upsert_responses = []
     try:
-        upsert_response = products_index.upsert([
-            (product.vector_id, embedding.tolist(), metadata)
-        ])
-        print(f"✓ Created vector for {product.name}")
-        print(f"  Vector ID: {product.vector_id}")
-        print(f"  Embedding dimension: {len(embedding)}")
-        print(f"  Upsert response: {upsert_response}")
-
-        # Verify the vector was added
-        vector_count_after = products_index.describe_index_stats().total_vector_count
-        print(f"\nVector count after insertion: {vector_count_after}")
-        print(f"Vectors added: {vector_count_after - vector_count_before}")
-    except Exception as e:
-        print(f"✗ Error creating vector for {product.name}: {str(e)}")
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            chunk, chunk_embeddings = item
+
+            # Quantize the whole chunk at once and convert it to lists in one bulk call
+            vector_values = quantize_embeddings(chunk_embeddings).astype(np.float32).tolist()
+            for product in chunk:
+                product.vector_id = str(uuid4())
+            vectors = [(product.vector_id, values, {
+                "product_id": str(product.id),
+                "name": product.name,
+                "price": float(product.price),
+                "stock": int(product.stock),
+                "description": product.description
+            }) for product, values in zip(chunk, vector_values)]
+
+            if products_index is not None:
+                upsert_responses.extend(bulk_upsert(products_index, vectors, chunk_size=batch_size))
+            all_embeddings.append(chunk_embeddings)
+    finally:
+        # Stop the producer (e.g. if an upsert failed), drain anything it queued
+        # so it can't stay blocked on a full queue, then wait for it to exit
+        stop.set()
+        while True:
+            try:
+                chunks.get_nowait()
+            except queue.Empty:
+                break
+        producer.join()
+
+    if errors:
+        raise errors[0]
+    if not all_embeddings:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32), upsert_responses
+    return np.concatenate(all_embeddings), upsert_responses
+
+log.info("Creating vector embeddings for products...")
+# Encode and upsert in an overlapped pipeline,
+# reading index stats only once before and once after the whole ingest
+stats = None
+embeddings = None
+# True only when the index held nothing before this ingest, i.e. it now holds
+# exactly the catalog and can be mirrored by in-process search
+index_mirrors_catalog = False
+try:
+    if products_index is not None:
+        vector_count_before = products_index.describe_index_stats().total_vector_count
+        log.info("Current vector count: %s", vector_count_before)
+
+    embeddings, upsert_responses = ingest_products(products, embeddings_chunk_size=1000, batch_size=32)
+    # Only a successful ingest into an empty index leaves it holding exactly the catalog
+    index_mirrors_catalog = products_index is not None and vector_count_before == 0
+    log.info("Encoded %s products (embedding dimension: %s)", len(products), embeddings.shape[1])
+
+    if products_index is None:
+        log.info("\nSkipping upsert: product vectors are kept in memory for local search")
+    else:
+        log.info("\n✓ Created %s product vectors", len(products))
+        log.info("  Upsert responses: %s", upsert_responses)
+
+        # Verify the vectors were added
+        stats = products_index.describe_index_stats()
+        vector_count_after = stats.total_vector_count
+        log.info("\nVector count after insertion: %s", vector_count_after)
+        log.info("Vectors added: %s", vector_count_after - vector_count_before)
+        if vector_count_after - vector_count_before != len(products):
+            log.info("  (index stats may lag behind recent upserts)")
+except Exception as e:
+    index_mirrors_catalog = False
+    log.error("✗ Error creating product vectors: %s", str(e))
 
 # Print sample data
-print("\nUsers:")
+log.info("\nUsers:")
 for user in users:
-    print(f"  {user.username} ({user.role})")
+    log.info("  %s (%s)", user.username, user.role)
 
-print("\nProducts:")
+log.info("\nProducts:")
 for product in products:
-    print(f"  {product.name}: ${product.price} (Stock: {product.stock})")
-    print(f"    Vector ID: {product.vector_id}")
+    log.info("  %s: $%s (Stock: %s)", product.name, product.price, product.stock)
+    log.info("    Vector ID: %s", product.vector_id)
 
-print("\nOrders:")
+log.info("\nOrders:")
 for order in orders:
-    print(f"  Order {order.id}: ${order.total} ({order.status})")
+    log.info("  Order %s: $%s (%s)", order.id, order.total, order.status)
 
-# Print vector database stats
-try:
-    stats = products_index.describe_index_stats()
-    print(f"\nVector Database Summary:")
-    print(f"Total vectors: {stats.total_vector_count}")
-    print(f"Dimension: {stats.dimension}")
-    print(f"Namespaces: {list(stats.namespaces.keys()) if stats.namespaces else 'default'}")
-except Exception as e:
-    print(f"\nError getting vector database stats: {str(e)}")
+# Print vector database stats (reusing the post-upsert stats when available)
+if products_index is None:
+    log.info("\nVector Database Summary: skipped, Pinecone index unavailable")
+else:
+    try:
+        if stats is None:
+            stats = products_index.describe_index_stats()
+        log.info("\nVector Database Summary:")
+        log.info("Total vectors: %s", stats.total_vector_count)
+        log.info("Dimension: %s", stats.dimension)
+        log.info("Namespaces: %s", list(stats.namespaces.keys()) if stats.namespaces else 'default')
+    except Exception as e:
+        log.error("\nError getting vector database stats: %s", str(e))
 
 """## 3. Implement RBAC Logic
 
@@ -343,66 +620,178 @@ Each role has a specific set of permissions:
 The code below shows the implementation and outputs each user's permissions.
 """
 
+# Permissions for each role, defined once at module level
+_RAW_ROLE_PERMISSIONS = {
+    ROLE_CUSTOMER: {
+        P_VIEW_PRODUCTS,
+        P_VIEW_OWN_ORDERS,
+        P_PLACE_ORDER,
+        P_VECTOR_SEARCH_BASIC  # Basic vector similarity search
+    },
+    ROLE_SALES_REP: {
+        P_VIEW_PRODUCTS,
+        P_VIEW_ALL_ORDERS,
+        P_UPDATE_ORDER_STATUS,
+        P_VIEW_CUSTOMER_INFO,
+        P_VECTOR_SEARCH_BASIC,
+        P_VECTOR_SEARCH_ADVANCED  # Advanced vector operations
+    },
+    ROLE_DATA_SCIENTIST: {
+        P_VIEW_PRODUCTS,
+        P_VECTOR_SEARCH_BASIC,
+        P_VECTOR_SEARCH_ADVANCED,
+        P_VECTOR_CREATE,
+        P_VECTOR_DELETE,
+        P_VECTOR_UPDATE
+    },
+    ROLE_ADMIN: {
+        P_VIEW_PRODUCTS,
+        P_UPDATE_PRODUCT_STOCK,
+        P_VIEW_ALL_ORDERS,
+        P_UPDATE_ORDER_STATUS,
+        P_VIEW_CUSTOMER_INFO,
+        P_MANAGE_USERS,
+        P_PLACE_ORDER,
+        P_VECTOR_SEARCH_BASIC,
+        P_VECTOR_SEARCH_ADVANCED,
+        P_VECTOR_CREATE,
+        P_VECTOR_DELETE,
+        P_VECTOR_UPDATE,
+        P_VECTOR_MANAGE_INDEX
+    }
+}
+
+# Immutable, interned permission sets shared by every RBACSystem instance
+_ROLE_PERMS: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    sys.intern(role): frozenset(map(sys.intern, permissions))
+    for role, permissions in _RAW_ROLE_PERMISSIONS.items()
+})
+
+# Permission masks are stored as uint64 in UserTable
+MAX_PERMISSIONS = 64
+
 class RBACSystem:
     def __init__(self):
-        # Define permissions for each role
-        self.role_permissions = {
-            "customer": {
-                "view_products",
-                "view_own_orders",
-                "place_order",
-                "vector_search_basic"  # Basic vector similarity search
-            },
-            "sales_rep": {
-                "view_products",
-                "view_all_orders",
-                "update_order_status",
-                "view_customer_info",
-                "vector_search_basic",
-                "vector_search_advanced"  # Advanced vector operations
-            },
-            "data_scientist": {
-                "view_products",
-                "vector_search_basic",
-                "vector_search_advanced",
-                "vector_create",
-                "vector_delete",
-                "vector_update"
-            },
-            "admin": {
-                "view_products",
-                "update_product_stock",
-                "view_all_orders",
-                "update_order_status",
-                "view_customer_info",
-                "manage_users",
-                "place_order",
-                "vector_search_basic",
-                "vector_search_advanced",
-                "vector_create",
-                "vector_delete",
-                "vector_update",
-                "vector_manage_index"
-            }
+        # Private copy of the shared mapping (the frozensets themselves are shared,
+        # not re-allocated); add_role is the only way to change it, so the public
+        # view below and the bitmasks used by has_permission never disagree
+        self._role_permissions = dict(_ROLE_PERMS)
+        self.role_permissions = MappingProxyType(self._role_permissions)
+        self._empty = frozenset()
+
+        # Give each known permission its own bit and precompute a bitmask per role;
+        # bits come from PERMISSIONS so the layout doesn't depend on which roles exist
+        self._perm_bits = {name: 1 << i for i, name in enumerate(sorted(PERMISSIONS))}
+        self._role_mask = {
+            role: self._permission_mask(permissions)
+            for role, permissions in self.role_permissions.items()
         }
+        # Callbacks run after add_role, e.g. to refresh a UserTable's masks
+        self._role_change_listeners = []
+
+    def add_role_change_listener(self, callback):
+        self._role_change_listeners.append(callback)
+
+    def _permission_mask(self, permissions: Set[str]) -> int:
+        return functools.reduce(operator.or_, (self._perm_bits[p] for p in permissions), 0)
+
+    def add_role(self, role: str, permissions: Set[str]):
+        """Add or replace a role with the given set of permissions"""
+        role = sys.intern(role)
+        permissions = frozenset(map(sys.intern, permissions))
+        new_permissions = sorted(permissions - self._perm_bits.keys())
+        if len(self._perm_bits) + len(new_permissions) > MAX_PERMISSIONS:
+            raise ValueError(
+                f"Cannot add role '{role}': at most {MAX_PERMISSIONS} distinct permissions "
+                "fit in a permission bitmask"
+            )
+        self._role_permissions[role] = permissions
+        for permission in new_permissions:
+            self._perm_bits[permission] = 1 << len(self._perm_bits)
+        self._role_mask[role] = self._permission_mask(permissions)
+        for callback in self._role_change_listeners:
+            callback()
 
     def has_permission(self, user: User, permission: str) -> bool:
-        if user.role not in self.role_permissions:
-            return False
-        return permission in self.role_permissions[user.role]
+        return bool(self._role_mask.get(user.role, 0) & self._perm_bits.get(permission, 0))
 
     def get_user_permissions(self, user: User) -> Set[str]:
-        return self.role_permissions.get(user.role, set())
+        return self.role_permissions.get(user.role, self._empty)
+
+    def role_mask(self, role: str) -> int:
+        return self._role_mask.get(role, 0)
+
+    def permission_bit(self, permission: str) -> int:
+        return self._perm_bits.get(permission, 0)
+
+# Holding any one of these permissions allows vector search
+VECTOR_SEARCH_PERMISSIONS = (P_VECTOR_SEARCH_BASIC, P_VECTOR_SEARCH_ADVANCED)
+
+def rbac_required(*permissions: str, denied):
+    """Gate a method on the user holding any of the permissions.
+
+    The check runs before the method body, so no embedding or index work can
+    happen for a denied user. The decorated method must take (self, user, ...)
+    and its instance must expose an `rbac` attribute. `denied` is returned
+    (copied) on refusal; if it is callable, it is called with the method's
+    remaining arguments to build the refusal instead.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, user: User, *args, **kwargs):
+            if not any(self.rbac.has_permission(user, permission) for permission in permissions):
+                if callable(denied):
+                    return denied(*args, **kwargs)
+                return copy.copy(denied)
+            return method(self, user, *args, **kwargs)
+        return wrapper
+    return decorator
+
+class UserTable:
+    """Column-oriented view of users for bulk permission scans"""
+
+    def __init__(self, rbac: RBACSystem, users: List[User]):
+        self.rbac = rbac
+        self.ids = np.array([user.id for user in users], dtype=np.int64)
+        self.roles = np.array([user.role for user in users], dtype=object)
+        self.refresh()
+        # Recompute masks whenever a role is added or redefined
+        rbac.add_role_change_listener(self.refresh)
+
+    def refresh(self):
+        """Recompute every user's permission mask from the current role definitions"""
+        self.role_masks = np.array([self.rbac.role_mask(role) for role in self.roles], dtype=np.uint64)
+
+    def set_role(self, user_id: int, role: str):
+        """Update a user's role and recompute their permission mask"""
+        row = np.flatnonzero(self.ids == user_id)
+        if row.size == 0:
+            raise KeyError(f"No user with id {user_id} in the user table")
+        self.roles[row] = role
+        self.role_masks[row] = self.rbac.role_mask(role)
+
+    def promote(self, user: User, role: str):
+        """Change a user's role on both the User object and this table"""
+        self.set_role(user.id, role)
+        user.role = role
+
+    def has_permission(self, permission: str) -> np.ndarray:
+        """Boolean mask of users holding the permission, in one vectorized AND"""
+        return (self.role_masks & np.uint64(self.rbac.permission_bit(permission))) != 0
+
+    def users_with_permission(self, permission: str) -> np.ndarray:
+        return self.ids[self.has_permission(permission)]
 
 # Create RBAC system instance
 rbac = RBACSystem()
+user_table = UserTable(rbac, users)
 
 # Print permissions for each role
 for user in users:
-    print(f"\nPermissions for {user.username} ({user.role}):")
+    log.info("\nPermissions for %s (%s):", user.username, user.role)
     permissions = rbac.get_user_permissions(user)
     for permission in sorted(permissions):
-        print(f"  - {permission}")
+        log.info("  - %s", permission)
 
 """## 4. Test Access Control
 
@@ -433,16 +822,145 @@ You should see:
 The code below runs these tests and shows the results:
 """
 
+# Queries scoring above this cosine similarity against a cached query reuse its results
+SEMANTIC_CACHE_THRESHOLD = 0.92
+# Number of cached searches kept per system; the oldest entry is evicted first
+SEMANTIC_CACHE_SIZE = 256
+
+@functools.lru_cache(maxsize=1024)
+def _encode_query(query: str) -> tuple:
+    """Encode a single search query, caching the embedding for repeated queries"""
+    return tuple(model.encode(query, normalize_embeddings=True).tolist())
+
+def encode_queries(queries: List[str]):
+    """Encode a list of search queries in a single length-sorted batch"""
+    return model.encode(
+        queries,
+        batch_size=32,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+
+# Catalogs smaller than this are searched in-process instead of round-tripping to Pinecone
+LOCAL_SEARCH_THRESHOLD = 1024
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True)
+    def _topk_cosine(mat, q, k):
+        """Score every row of the normalized matrix against q and return the top-k rows"""
+        scores = np.empty(mat.shape[0], dtype=np.float32)
+        for i in prange(mat.shape[0]):
+            score = 0.0
+            for j in range(mat.shape[1]):
+                score += mat[i, j] * q[j]
+            scores[i] = score
+        top = np.argsort(-scores)[:k]
+        return top, scores[top]
+else:
+    def _topk_cosine(mat, q, k):
+        """Score every row with one matrix-vector product and return the top-k rows"""
+        scores = mat @ q
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
 class ECommerceSystem:
-    def __init__(self, rbac: RBACSystem, users: List[User], products: List[Product], orders: List[Order]):
+    def __init__(self, rbac: RBACSystem, users: List[User], products: List[Product], orders: List[Order],
+                 product_embeddings: np.ndarray = None, index_mirrors_catalog: bool = False):
         self.rbac = rbac
         self.users = {user.id: user for user in users}
         self.products = {product.id: product for product in products}
         self.orders = {order.id: order for order in orders}
         self.vector_index = products_index
+        self._score_scale = int8_score_scale(products_index_metric)
+
+        # Product embeddings for in-process search; the normalized matrix is built on first use
+        self._product_list = list(products)
+        self._product_embeddings = product_embeddings
+        self._product_matrix = None
+        # Local search only mirrors the index while it holds nothing but the products
+        self._local_search_enabled = index_mirrors_catalog
+        # Semantic cache of normalized query embeddings and their search results
+        # stored as a fixed-size FIFO ring so inserts are O(1) and memory is bounded
+        self._cache_embeddings = np.zeros(
+            (SEMANTIC_CACHE_SIZE, model.get_sentence_embedding_dimension()), dtype=np.float32
+        )
+        self._cache_top_k = np.full(SEMANTIC_CACHE_SIZE, -1, dtype=np.int64)  # -1 marks an empty slot
+        self._cache_results = [None] * SEMANTIC_CACHE_SIZE
+        self._cache_next = 0  # slot to overwrite on the next insert
+        self._cache_generation = 0  # bumped on every clear; stale searches don't get cached
+        self._cache_lock = threading.Lock()  # searches may run from several threads
+
+    def clear_search_cache(self):
+        """Drop cached search results, e.g. after vectors are added to the index"""
+        with self._cache_lock:
+            self._cache_top_k[:] = -1
+            self._cache_results = [None] * SEMANTIC_CACHE_SIZE
+            self._cache_next = 0
+            self._cache_generation += 1
+
+    def _cache_store(self, query_embedding: np.ndarray, top_k: int, results: List[Dict], generation: int):
+        with self._cache_lock:
+            # The cache was cleared while this search ran, so its results may predate
+            # vectors added in the meantime
+            if generation != self._cache_generation:
+                return
+            slot = self._cache_next
+            self._cache_embeddings[slot] = query_embedding
+            self._cache_top_k[slot] = top_k
+            self._cache_results[slot] = [dict(result) for result in results]
+            self._cache_next = (slot + 1) % SEMANTIC_CACHE_SIZE
+
+    def index_changed(self):
+        """Invalidate search state after vectors are added to the index outside this system"""
+        self.clear_search_cache()
+        self._local_search_enabled = False
+
+    def _use_local_search(self) -> bool:
+        if self.vector_index is None:
+            return True
+        return self._local_search_enabled and len(self.products) < LOCAL_SEARCH_THRESHOLD
+
+    def _get_product_matrix(self) -> np.ndarray:
+        if self._product_matrix is None:
+            embeddings = self._product_embeddings
+            if embeddings is None:
+                embeddings = model.encode(
+                    [p.description for p in self._product_list],
+                    batch_size=64,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+            self._product_matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        return self._product_matrix
+
+    def _cached_search(self, query_embedding: np.ndarray, top_k: int):
+        """Return a copy of cached results for a semantically similar query, if any"""
+        with self._cache_lock:
+            candidates = np.flatnonzero(self._cache_top_k == top_k)
+            if candidates.size == 0:
+                return None
+            similarities = self._cache_embeddings[candidates] @ query_embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+                return None
+            return [dict(result) for result in self._cache_results[candidates[best]]]
+
+    def _local_vector_search(self, query_vector: np.ndarray, top_k: int) -> List[Dict]:
+        """Cosine top-k over the in-memory product matrix, shaped like Pinecone results"""
+        top, scores = _topk_cosine(self._get_product_matrix(), query_vector, min(top_k, len(self._product_list)))
+        return [{
+            "product_name": self._product_list[i].name,
+            "price": self._product_list[i].price,
+            "description": self._product_list[i].description,
+            "similarity_score": float(score),
+            "vector_id": self._product_list[i].vector_id
+        } for i, score in zip(top, scores)]
 
     def view_products(self, user: User) -> List[Dict]:
-        if not self.rbac.has_permission(user, "view_products"):
+        if not self.rbac.has_permission(user, P_VIEW_PRODUCTS):
             return ["Access Denied: No permission to view products"]
 
         return [
@@ -451,15 +969,15 @@ class ECommerceSystem:
         ]
 
     def view_orders(self, user: User, order_id: int = None) -> List[Dict]:
-        if not (self.rbac.has_permission(user, "view_all_orders") or
-                self.rbac.has_permission(user, "view_own_orders")):
+        if not (self.rbac.has_permission(user, P_VIEW_ALL_ORDERS) or
+                self.rbac.has_permission(user, P_VIEW_OWN_ORDERS)):
             return ["Access Denied: No permission to view orders"]
 
         if order_id is not None:
             order = self.orders.get(order_id)
             if not order:
                 return ["Order not found"]
-            if (not self.rbac.has_permission(user, "view_all_orders") and
+            if (not self.rbac.has_permission(user, P_VIEW_ALL_ORDERS) and
                 order.user_id != user.id):
                 return ["Access Denied: Can only view your own orders"]
             return [{
@@ -470,7 +988,7 @@ class ECommerceSystem:
             }]
 
         # View all orders
-        if self.rbac.has_permission(user, "view_all_orders"):
+        if self.rbac.has_permission(user, P_VIEW_ALL_ORDERS):
             orders_to_show = self.orders.values()
         else:
             orders_to_show = [o for o in self.orders.values() if o.user_id == user.id]
@@ -485,84 +1003,127 @@ class ECommerceSystem:
             for order in orders_to_show
         ]
 
-    def vector_search(self, user: User, query: str, top_k: int = 3) -> List[Dict]:
-        """Perform vector similarity search with detailed results"""
-        if not (self.rbac.has_permission(user, "vector_search_basic") or
-                self.rbac.has_permission(user, "vector_search_advanced")):
-            return ["Access Denied: No permission to perform vector search"]
+    @rbac_required(*VECTOR_SEARCH_PERMISSIONS,
+                   denied=["Access Denied: No permission to perform vector search"])
+    def vector_search(self, user: User, query: str, top_k: int = 3, query_embedding=None) -> List[Dict]:
+        """Perform vector similarity search with detailed results
 
+        A precomputed query_embedding can be passed to skip encoding the query.
+        """
         try:
-            print(f"\nPerforming vector search for query: '{query}'")
-            print(f"User: {user.username} ({user.role})")
-
-            # Generate query embedding
-            query_embedding = model.encode(query).tolist()
-
-            # Debug: Print query embedding details
-            print(f"Searching for: {query}")
-            print(f"Query embedding dimension: {len(query_embedding)}")
-
-            # Perform vector search
-            results = self.vector_index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
-            )
-
-            # Debug: Print search response details
-            print(f"\nSearch response: {results}")
-
-            if not results.matches:
-                print("No matches found!")
-                return []
-
-            # Process search results
-            formatted_results = [{
-                "product_name": match.metadata["name"],
-                "price": match.metadata["price"],
-                "description": match.metadata["description"],
-                "similarity_score": float(match.score),
-                "vector_id": match.id
-            } for match in results.matches]
+            log.info("\nPerforming vector search for query: '%s'", query)
+            log.info("User: %s (%s)", user.username, user.role)
+
+            # Generate query embedding (unless one was encoded ahead of time)
+            if query_embedding is None:
+                query_embedding = _encode_query(query)
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+
+            cached_results = self._cached_search(query_vector, top_k)
+            if cached_results is not None:
+                log.info("Using cached results for a similar query (%s products)", len(cached_results))
+                return cached_results
+
+            # Remember the cache generation before searching, so results are only
+            # cached if no vectors were added while the search was running
+            with self._cache_lock:
+                cache_generation = self._cache_generation
+
+            if self._use_local_search():
+                # Small catalog (or no Pinecone): search the local product matrix instead
+                formatted_results = self._local_vector_search(query_vector, top_k)
+            else:
+                query_embedding = quantize_embeddings(query_vector).astype(np.float32).tolist()
+
+                # Debug: Print query embedding details
+                log.debug("Searching for: %s", query)
+                log.debug("Query embedding dimension: %s", len(query_embedding))
+
+                # Perform vector search
+                results = self.vector_index.query(
+                    vector=query_embedding,
+                    top_k=top_k,
+                    include_metadata=True
+                )
 
-            # Print detailed results
-            print(f"\nFound {len(formatted_results)} matching products:")
+                # Debug: Print search response details
+                log.debug("\nSearch response: %s", results)
+
+                if not results.matches:
+                    log.info("No matches found!")
+                    return []
+
+                # Process search results
+                formatted_results = [{
+                    "product_name": match.metadata["name"],
+                    "price": match.metadata["price"],
+                    "description": match.metadata["description"],
+                    # Index stores int8 codes, so rescale the raw score back to cosine similarity
+                    "similarity_score": float(match.score) * self._score_scale,
+                    "vector_id": match.id
+                } for match in results.matches]
+
+            # Log detailed results
+            log.info("\nFound %s matching products:", len(formatted_results))
             for idx, result in enumerate(formatted_results, 1):
-                print(f"\n{idx}. {result['product_name']}")
-                print(f"   Similarity Score: {result['similarity_score']:.4f}")
-                print(f"   Price: ${result['price']}")
+                log.info("\n%s. %s\n   Similarity Score: %.4f\n   Price: $%s",
+                         idx, result['product_name'], result['similarity_score'], result['price'])
+
+            # Cache the results for semantically similar future queries
+            self._cache_store(query_vector, top_k, formatted_results, cache_generation)
 
             return formatted_results
         except Exception as e:
             error_msg = f"Error performing vector search: {str(e)}"
-            print(f"\n✗ {error_msg}")
+            log.error("\n✗ %s", error_msg)
             return [error_msg]
 
+    @rbac_required(*VECTOR_SEARCH_PERMISSIONS,
+                   denied=lambda queries, *args, **kwargs: [
+                       ["Access Denied: No permission to perform vector search"] for query in queries
+                   ])
+    def batch_vector_search(self, user: User, queries: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """Run several vector searches, encoding all queries in one batch"""
+        # SentenceTransformer sorts a list of inputs by length internally,
+        # so the batch is padded once instead of once per query
+        query_embeddings = encode_queries(queries)
+        return [
+            self.vector_search(user, query, top_k=top_k, query_embedding=query_embedding)
+            for query, query_embedding in zip(queries, query_embeddings)
+        ]
+
 # Create system instance
-system = ECommerceSystem(rbac, users, products, orders)
+system = ECommerceSystem(rbac, users, products, orders, product_embeddings=embeddings,
+                         index_mirrors_catalog=index_mirrors_catalog)
 
-print("Testing vector search capabilities...\n")
+log.info("Testing vector search capabilities...\n")
 
 # Test customer access with basic search
 alice = users[0]  # customer
-print(f"1. {alice.username} (Customer) searching for gaming products:")
+log.info("1. %s (Customer) searching for gaming products:", alice.username)
 results = system.vector_search(alice, "high performance gaming laptop")
 if isinstance(results, list) and not isinstance(results[0], str):
-    print("✓ Basic vector search successful!")
+    log.info("✓ Basic vector search successful!")
 
 # Test data scientist access with advanced search
 carol = users[2]  # data_scientist
-print(f"\n2. {carol.username} (Data Scientist) searching for audio equipment:")
+log.info("\n2. %s (Data Scientist) searching for audio equipment:", carol.username)
 results = system.vector_search(carol, "premium audio with noise cancellation")
 if isinstance(results, list) and not isinstance(results[0], str):
-    print("✓ Advanced vector search successful!")
+    log.info("✓ Advanced vector search successful!")
 
 # Test admin access with general search
 david = users[3]  # admin
-print(f"\n3. {david.username} (Admin) searching for mobile devices:")
+log.info("\n3. %s (Admin) searching for mobile devices:", david.username)
 results = system.vector_search(david, "smartphone with good camera")
 if isinstance(results, list) and not isinstance(results[0], str):
-    print("✓ Admin vector search successful!")
+    log.info("✓ Admin vector search successful!")
+
+# Test several searches encoded together in one batch
+log.info("\n4. %s (Admin) running a batch of searches:", david.username)
+batch_results = system.batch_vector_search(david, ["wireless audio", "mobile photography", "4K gaming"])
+if all(isinstance(r, list) and not isinstance(r[0], str) for r in batch_results):
+    log.info("✓ Batch vector search successful!")
 
 """## 5. Update Permissions
 
@@ -570,24 +1131,24 @@ Now let's demonstrate how to update permissions and roles in our RBAC system.
 """
 
 # Add a new role with custom permissions
-rbac.role_permissions["senior_sales_rep"] = {
-    "view_products",
-    "view_all_orders",
-    "update_order_status",
-    "view_customer_info",
-    "update_product_stock"  # Additional permission
-}
-
-rbac.role_permissions["senior_data_scientist"] = {
-    "view_products",
-    "vector_search_basic",
-    "vector_search_advanced",
-    "vector_create",
-    "vector_delete",
-    "vector_update",
-    "vector_manage_index",  # Additional permission
-    "view_all_orders"      # Additional permission
-}
+rbac.add_role(ROLE_SENIOR_SALES_REP, {
+    P_VIEW_PRODUCTS,
+    P_VIEW_ALL_ORDERS,
+    P_UPDATE_ORDER_STATUS,
+    P_VIEW_CUSTOMER_INFO,
+    P_UPDATE_PRODUCT_STOCK  # Additional permission
+})
+
+rbac.add_role(ROLE_SENIOR_DATA_SCIENTIST, {
+    P_VIEW_PRODUCTS,
+    P_VECTOR_SEARCH_BASIC,
+    P_VECTOR_SEARCH_ADVANCED,
+    P_VECTOR_CREATE,
+    P_VECTOR_DELETE,
+    P_VECTOR_UPDATE,
+    P_VECTOR_MANAGE_INDEX,  # Additional permission
+    P_VIEW_ALL_ORDERS      # Additional permission
+})
 
 # Get user references from the users list
 alice = next(user for user in users if user.username == "alice")
@@ -595,20 +1156,24 @@ bob = next(user for user in users if user.username == "bob")
 carol = next(user for user in users if user.username == "carol")
 
 # Promote Bob to senior sales rep
-bob.role = "senior_sales_rep"
+user_table.promote(bob, ROLE_SENIOR_SALES_REP)
 
 # Promote Carol to senior data scientist
-carol.role = "senior_data_scientist"
+user_table.promote(carol, ROLE_SENIOR_DATA_SCIENTIST)
 
-print(f"Updated permissions for {bob.username}:")
+log.info("Updated permissions for %s:", bob.username)
 permissions = rbac.get_user_permissions(bob)
 for permission in sorted(permissions):
-    print(f"  - {permission}")
+    log.info("  - %s", permission)
 
-print(f"\nUpdated permissions for {carol.username}:")
+log.info("\nUpdated permissions for %s:", carol.username)
 permissions = rbac.get_user_permissions(carol)
 for permission in sorted(permissions):
-    print(f"  - {permission}")
+    log.info("  - %s", permission)
+
+# Bulk check: which users can now update stock?
+stock_user_ids = user_table.users_with_permission(P_UPDATE_PRODUCT_STOCK)
+log.info("\nUsers who can update stock: %s", [user.username for user in users if user.id in stock_user_ids])
 
 # Test the updated permissions
 class InventoryManagement:
@@ -617,7 +1182,7 @@ class InventoryManagement:
         self.products = {p.id: p for p in products}
 
     def update_stock(self, user: User, product_id: int, new_stock: int) -> str:
-        if not self.rbac.has_permission(user, "update_product_stock"):
+        if not self.rbac.has_permission(user, P_UPDATE_PRODUCT_STOCK):
             return "Access Denied: No permission to update stock"
 
         if product_id not in self.products:
@@ -630,64 +1195,69 @@ class InventoryManagement:
 inventory = InventoryManagement(rbac, products)
 
 # Test stock update with different users
-print(f"\nTesting stock updates:")
-print(f"1. Alice (Customer) attempting to update stock:")
-print(inventory.update_stock(alice, 1, 45))
+log.info("\nTesting stock updates:")
+log.info("1. Alice (Customer) attempting to update stock:")
+log.info("%s", inventory.update_stock(alice, 1, 45))
 
-print(f"\n2. Bob (Senior Sales Rep) attempting to update stock:")
-print(inventory.update_stock(bob, 1, 45))
+log.info("\n2. Bob (Senior Sales Rep) attempting to update stock:")
+log.info("%s", inventory.update_stock(bob, 1, 45))
 
 # Verify the stock update
-print(f"\nUpdated product information:")
-print(system.view_products(bob)[0])
+log.info("\nUpdated product information:")
+log.info("%s", system.view_products(bob)[0])
 
 # Test the updated permissions with vector operations
 class VectorManagement:
-    def __init__(self, rbac: RBACSystem, vector_index):
+    def __init__(self, rbac: RBACSystem, vector_index, on_index_change=None):
         self.rbac = rbac
         self.vector_index = vector_index
+        # Called after every successful upsert so search caches can be invalidated
+        self.on_index_change = on_index_change
 
+    @rbac_required(P_VECTOR_CREATE, denied="Access Denied: No permission to create vectors")
     def create_vector(self, user: User, data: str, metadata: Dict) -> str:
-        if not self.rbac.has_permission(user, "vector_create"):
-            return "Access Denied: No permission to create vectors"
+        if self.vector_index is None:
+            return "Vector index unavailable, vector not stored"
 
         try:
             vector_id = str(uuid4())
-            embedding = model.encode(data).tolist()
+            embedding = quantize_embeddings(model.encode(data, normalize_embeddings=True))
 
             self.vector_index.upsert([
-                (vector_id, embedding, metadata)
+                (vector_id, embedding.astype(np.float32).tolist(), metadata)
             ])
+            if self.on_index_change is not None:
+                self.on_index_change()
 
             return f"Vector created successfully with ID: {vector_id}"
         except Exception as e:
             return f"Error creating vector: {str(e)}"
 
 # Create vector management instance
-vector_mgmt = VectorManagement(rbac, pc.Index("products"))
+vector_mgmt = VectorManagement(rbac, products_index, on_index_change=system.index_changed)
 
 # Test vector operations with different users
-print(f"\nTesting vector operations:")
+log.info("\nTesting vector operations:")
 
 # Test with customer (should fail)
-print(f"1. Alice (Customer) attempting to create vector:")
-print(vector_mgmt.create_vector(
+log.info("1. Alice (Customer) attempting to create vector:")
+log.info("%s", vector_mgmt.create_vector(
     alice,
     "New gaming monitor with 4K resolution",
     {"name": "Gaming Monitor", "price": 399.99}
 ))
 
 # Test with senior data scientist (should succeed)
-print(f"\n2. Carol (Senior Data Scientist) attempting to create vector:")
-print(vector_mgmt.create_vector(
+log.info("\n2. Carol (Senior Data Scientist) attempting to create vector:")
+log.info("%s", vector_mgmt.create_vector(
     carol,
     "New gaming monitor with 4K resolution",
     {"name": "Gaming Monitor", "price": 399.99}
 ))
 
 # Test vector search with new data
-print(f"\n3. Testing vector search with new data:")
-print(system.vector_search(carol, "4K display", top_k=2))
+log.info("\n3. Testing vector search with new data:")
+log.info("%s", system.vector_search(carol, "4K display", top_k=2))
 
 """## 6. Final Testing
 
@@ -726,46 +1296,80 @@ The final output will show:
 Watch the test results below:
 """
 
-def test_user_actions(system: ECommerceSystem, vector_mgmt: VectorManagement, user: User):
-    print(f"\nTesting {user.username} ({user.role}):")
+def test_user_actions(system: ECommerceSystem, vector_mgmt: VectorManagement, user: User, query_embedding=None) -> str:
+    """Run the test scenario for one user and return its report as text
+
+    Everything logged from this thread, including vector_search output, is
+    captured into the report, so parallel runs don't interleave.
+    """
+    out = io.StringIO()
+    _log_capture.buffer = out
+    try:
+        _run_user_actions(system, vector_mgmt, user, query_embedding)
+    finally:
+        _log_capture.buffer = None
+    return out.getvalue()
+
+def _run_user_actions(system: ECommerceSystem, vector_mgmt: VectorManagement, user: User, query_embedding):
+    log.info("\nTesting %s (%s):", user.username, user.role)
 
-    print("1. Basic Operations:")
-    print("  a. Viewing products:")
+    log.info("1. Basic Operations:")
+    log.info("  a. Viewing products:")
     products = system.view_products(user)
-    print("    Success" if isinstance(products, list) and products and isinstance(products[0], dict) else "    Failed")
+    log.info("    Success" if isinstance(products, list) and products and isinstance(products[0], dict) else "    Failed")
 
-    print("  b. Viewing orders:")
+    log.info("  b. Viewing orders:")
     orders = system.view_orders(user)
-    print("    Success" if isinstance(orders, list) and orders and isinstance(orders[0], dict) else "    Failed")
+    log.info("    Success" if isinstance(orders, list) and orders and isinstance(orders[0], dict) else "    Failed")
 
-    print("2. Vector Operations:")
-    print("  a. Basic vector search:")
-    search_results = system.vector_search(user, "high performance laptop")
-    print("    Success" if isinstance(search_results, list) and not isinstance(search_results[0], str) else "    Failed")
+    log.info("2. Vector Operations:")
+    log.info("  a. Basic vector search:")
+    search_results = system.vector_search(user, "high performance laptop", query_embedding=query_embedding)
+    log.info("    Success" if isinstance(search_results, list) and not isinstance(search_results[0], str) else "    Failed")
 
-    print("  b. Vector creation:")
+    log.info("  b. Vector creation:")
     create_result = vector_mgmt.create_vector(
         user,
         "Test product description",
         {"name": "Test Product", "price": 99.99}
     )
-    print(f"    {create_result}")
-
-# Test all users
-for user in users:
-    test_user_actions(system, vector_mgmt, user)
+    log.info("    %s", create_result)
+
+# Collect the search query of every user allowed to search and encode them in one
+# batch, so no embedding work is spent on users who would be denied anyway
+can_search = functools.reduce(
+    operator.or_, (user_table.has_permission(permission) for permission in VECTOR_SEARCH_PERMISSIONS)
+)
+test_queries = ["high performance laptop" if allowed else None for allowed in can_search]
+# Encode each distinct query once and map the embeddings back to the users
+unique_queries = sorted({query for query in test_queries if query is not None})
+encoded = dict(zip(unique_queries, encode_queries(unique_queries))) if unique_queries else {}
+test_embeddings = [encoded.get(query) for query in test_queries]
+
+# Each user's test is dominated by blocking Pinecone calls, so run them in parallel
+# and log every user's buffered report in order once it completes
+with ThreadPoolExecutor(max_workers=len(users)) as executor:
+    reports = executor.map(
+        lambda args: test_user_actions(system, vector_mgmt, *args),
+        zip(users, test_embeddings)
+    )
+    for report in reports:
+        log.info("%s", report.rstrip("\n"))
 
-print("\nRBAC Demo with Vector Database Integration Complete!")
+log.info("\nRBAC Demo with Vector Database Integration Complete!")
 
 # Print summary of vector database state
-try:
-    stats = pc.Index("products").describe_index_stats()
-    print(f"\nVector Database Summary:")
-    print(f"Total vectors: {stats.total_vector_count}")
-    print(f"Dimension: {stats.dimension}")
-    print(f"Namespaces: {list(stats.namespaces.keys()) if stats.namespaces else 'default'}")
-except Exception as e:
-    print(f"\nError getting vector database stats: {str(e)}")
+if products_index is None:
+    log.info("\nVector Database Summary: skipped, Pinecone index unavailable")
+else:
+    try:
+        stats = products_index.describe_index_stats()
+        log.info("\nVector Database Summary:")
+        log.info("Total vectors: %s", stats.total_vector_count)
+        log.info("Dimension: %s", stats.dimension)
+        log.info("Namespaces: %s", list(stats.namespaces.keys()) if stats.namespaces else 'default')
+    except Exception as e:
+        log.error("\nError getting vector database stats: %s", str(e))
 
 """## Cleanup
 
@@ -780,12 +1384,12 @@ Remember to clean up resources when you're done testing:
 '''
 # Delete vectors if needed
 try:
-    pc.Index("products").delete(delete_all=True)
-    print("Cleaned up vector database")
+    products_index.delete(delete_all=True)
+    log.info("Cleaned up vector database")
 except Exception as e:
-    print(f"Error cleaning up vector database: {str(e)}")
+    log.error("Error cleaning up vector database: %s", str(e))
 
 # Reset user roles
-carol.role = "data_scientist"
-print("Reset user roles")
+user_table.promote(carol, ROLE_DATA_SCIENTIST)
+log.info("Reset user roles")
 '''
\ No newline at end of file